@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
+import os
+import logging
+import threading
 from pathlib import Path
 from datetime import datetime, date, timedelta
-import shutil
 
 # =========================
 # CONFIG
@@ -19,14 +21,82 @@ BACKUP_DIR.mkdir(exist_ok=True)
 DB_PATH = DATA_DIR / "or_equipment.db"
 RETENTION_DAYS = 31
 
+# =========================
+# SQL (module constants -> same text every call, hits sqlite3's statement cache)
+# =========================
+UPSERT_META_SQL = "INSERT INTO app_meta(k,v) VALUES(?,?) ON CONFLICT(k) DO UPDATE SET v=excluded.v"
+GET_META_SQL = "SELECT v FROM app_meta WHERE k=?"
+
+FETCH_EQUIPMENT_SQL = "SELECT * FROM equipment ORDER BY name"
+FETCH_ACTIVE_EQUIPMENT_SQL = "SELECT * FROM equipment WHERE active=1 ORDER BY name"
+
+INSERT_EQUIPMENT_SQL = """
+    INSERT INTO equipment(name, asset_code, serial_no, or_room, location_note, active, created_at)
+    VALUES (?,?,?,?,?,1,?)
+"""
+
+UPDATE_EQUIPMENT_SQL = """
+    UPDATE equipment
+    SET name=?, asset_code=?, serial_no=?, or_room=?, location_note=?, active=?
+    WHERE id=?
+"""
+
+UPSERT_DAILY_CHECK_SQL = """
+    INSERT INTO daily_check
+    (check_date,equipment_id,status,maintenance_date,damage_reason,remark,checked_by,updated_at)
+    VALUES (?,?,?,?,?,?,?,?)
+    ON CONFLICT(check_date,equipment_id) DO UPDATE SET
+        status=excluded.status,
+        maintenance_date=excluded.maintenance_date,
+        damage_reason=excluded.damage_reason,
+        remark=excluded.remark,
+        checked_by=excluded.checked_by,
+        updated_at=excluded.updated_at
+"""
+
+FETCH_DAILY_CHECKS_SQL = """
+    SELECT
+        e.id AS equipment_id,
+        e.or_room,
+        e.name,
+        e.asset_code,
+        e.serial_no,
+        dc.status,
+        dc.maintenance_date,
+        dc.damage_reason,
+        dc.remark,
+        dc.checked_by
+    FROM equipment e
+    LEFT JOIN daily_check dc
+      ON dc.equipment_id=e.id AND dc.check_date=?
+    WHERE e.active=1
+    ORDER BY e.or_room, e.name
+"""
+
 # =========================
 # DB HELPERS
 # =========================
+@st.cache_resource
 def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # one long-lived connection reused across reruns; writers wrap their
+    # statements in `with conn:` so each helper is a single transaction
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
     conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL lets readers run alongside the writer; NORMAL skips the fsync per commit
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute("PRAGMA busy_timeout = 5000;")
+    conn.execute("PRAGMA cache_size = -20000;")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
     return conn
 
+@st.cache_resource
+def _write_lock():
+    # get_conn() is shared by every session thread; sqlite3 has one implicit
+    # transaction per connection, so concurrent `with conn:` blocks must not interleave
+    return threading.Lock()
+
 def init_db():
     conn = get_conn()
     cur = conn.cursor()
@@ -67,121 +137,133 @@ def init_db():
     );
     """)
 
-    conn.commit()
-    conn.close()
+    # fetch_daily_checks joins on (equipment_id, check_date); the UNIQUE index is (check_date, equipment_id)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_dc_eq_date ON daily_check(equipment_id, check_date);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_eq_active_room_name ON equipment(active, or_room, name);")
 
-def upsert_meta(k, v):
-    conn = get_conn()
-    conn.execute(
-        "INSERT INTO app_meta(k,v) VALUES(?,?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
-        (k, v)
-    )
     conn.commit()
-    conn.close()
 
-def get_meta(k):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT v FROM app_meta WHERE k=?", (k,))
+def upsert_meta(k, v, conn=None):
+    with _write_lock(), (conn or get_conn()) as conn:
+        conn.execute(UPSERT_META_SQL, (k, v))
+
+def get_meta(k, conn=None):
+    cur = (conn or get_conn()).cursor()
+    cur.execute(GET_META_SQL, (k,))
     r = cur.fetchone()
-    conn.close()
     return r[0] if r else None
 
 # =========================
 # BACKUP
 # =========================
-def backup_db(reason="auto"):
+def backup_db(reason="auto", conn=None):
     if not DB_PATH.exists():
         return
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    shutil.copy2(DB_PATH, BACKUP_DIR / f"or_equipment_{reason}_{ts}.db")
+    # online backup API: consistent snapshot even with WAL + the cached connection open
+    dst = sqlite3.connect(BACKUP_DIR / f"or_equipment_{reason}_{ts}.db")
+    try:
+        (conn or get_conn()).backup(dst, pages=1024, sleep=0.001)
+    finally:
+        dst.close()
 
     cutoff = datetime.now() - timedelta(days=RETENTION_DAYS)
-    for f in BACKUP_DIR.glob("or_equipment_*.db"):
-        if datetime.fromtimestamp(f.stat().st_mtime) < cutoff:
-            f.unlink(missing_ok=True)
+    with os.scandir(BACKUP_DIR) as it:
+        for de in it:
+            if not (de.name.startswith("or_equipment_") and de.name.endswith(".db")):
+                continue
+            # timestamp is in the filename (..._YYYYmmdd_HHMMSS.db) -> no stat() needed
+            try:
+                _, d_part, t_part = de.name[:-3].rsplit("_", 2)
+                created = datetime.strptime(d_part + t_part, "%Y%m%d%H%M%S")
+            except ValueError:
+                created = datetime.fromtimestamp(de.stat().st_mtime)
+            if created < cutoff:
+                try:
+                    os.unlink(de.path)
+                except FileNotFoundError:
+                    pass
+
+@st.cache_resource
+def _backup_lock():
+    return threading.Lock()
+
+def _auto_backup_job(today, lock):
+    if not lock.acquire(blocking=False):
+        return  # another session is already backing up
+    # own connection: the thread must not interleave transactions with the UI's cached one
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if get_meta("last_backup_date", conn) != today:
+            backup_db("auto", conn)
+            # write directly: _write_lock() is a cache_resource and this thread has no script context
+            with conn:
+                conn.execute(UPSERT_META_SQL, ("last_backup_date", today))
+    except Exception:
+        logging.getLogger(__name__).exception("auto backup failed")
+    finally:
+        conn.close()
+        lock.release()
 
 def auto_backup_once_per_day():
     today = date.today().isoformat()
-    if get_meta("last_backup_date") != today:
-        backup_db("auto")
-        upsert_meta("last_backup_date", today)
+    # once app_meta confirms today's backup, later reruns in this session skip the read
+    if st.session_state.get("last_backup_date") == today:
+        return
+    if get_meta("last_backup_date") == today:
+        st.session_state["last_backup_date"] = today
+        return
+    # file copy runs in the background so the first paint of the day isn't blocked
+    threading.Thread(target=_auto_backup_job, args=(today, _backup_lock()), daemon=True).start()
 
 # =========================
 # DATA ACCESS
 # =========================
+def _read_frame(sql, params=()):
+    # fixed-schema queries: build straight from the fetched rows,
+    # skipping read_sql_query's per-column inference wrapper
+    cur = get_conn().execute(sql, params)
+    return pd.DataFrame.from_records(cur.fetchall(), columns=[c[0] for c in cur.description])
+
+@st.cache_data(ttl=30)
 def fetch_equipment(active_only=True):
-    conn = get_conn()
-    q = "SELECT * FROM equipment"
-    if active_only:
-        q += " WHERE active=1"
-    df = pd.read_sql_query(q + " ORDER BY name", conn)
-    conn.close()
-    return df
+    q = FETCH_ACTIVE_EQUIPMENT_SQL if active_only else FETCH_EQUIPMENT_SQL
+    return _read_frame(q)
 
 def insert_equipment(name, asset, sn, room, loc):
-    conn = get_conn()
-    conn.execute("""
-        INSERT INTO equipment(name, asset_code, serial_no, or_room, location_note, active, created_at)
-        VALUES (?,?,?,?,?,1,?)
-    """, (name, asset, sn, room, loc, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    with _write_lock(), get_conn() as conn:
+        conn.execute(INSERT_EQUIPMENT_SQL, (name, asset, sn, room, loc, datetime.now().isoformat()))
+    fetch_equipment.clear()
+    fetch_daily_checks.clear()
 
 def update_equipment(eid, name, asset, sn, room, loc, active):
-    conn = get_conn()
-    conn.execute("""
-        UPDATE equipment
-        SET name=?, asset_code=?, serial_no=?, or_room=?, location_note=?, active=?
-        WHERE id=?
-    """, (name, asset, sn, room, loc, 1 if active else 0, eid))
-    conn.commit()
-    conn.close()
+    with _write_lock(), get_conn() as conn:
+        conn.execute(UPDATE_EQUIPMENT_SQL, (name, asset, sn, room, loc, 1 if active else 0, eid))
+    fetch_equipment.clear()
+    fetch_daily_checks.clear()
 
 def upsert_daily_check(d, eid, status, mdate, reason, remark, by):
-    conn = get_conn()
-    conn.execute("""
-        INSERT INTO daily_check
-        (check_date,equipment_id,status,maintenance_date,damage_reason,remark,checked_by,updated_at)
-        VALUES (?,?,?,?,?,?,?,?)
-        ON CONFLICT(check_date,equipment_id) DO UPDATE SET
-            status=excluded.status,
-            maintenance_date=excluded.maintenance_date,
-            damage_reason=excluded.damage_reason,
-            remark=excluded.remark,
-            checked_by=excluded.checked_by,
-            updated_at=excluded.updated_at
-    """, (d, eid, status, mdate, reason, remark, by, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    upsert_daily_checks([(d, eid, status, mdate, reason, remark, by, datetime.now().isoformat())])
 
+def upsert_daily_checks(rows):
+    """rows: (check_date, equipment_id, status, mdate, reason, remark, by, updated_at)"""
+    with _write_lock(), get_conn() as conn:
+        conn.executemany(UPSERT_DAILY_CHECK_SQL, rows)
+    fetch_daily_checks.clear()
+
+@st.cache_data(ttl=30)
 def fetch_daily_checks(d):
-    conn = get_conn()
-    df = pd.read_sql_query("""
-        SELECT
-            e.id AS equipment_id,
-            e.or_room,
-            e.name,
-            e.asset_code,
-            e.serial_no,
-            dc.status,
-            dc.maintenance_date,
-            dc.damage_reason,
-            dc.remark,
-            dc.checked_by
-        FROM equipment e
-        LEFT JOIN daily_check dc
-          ON dc.equipment_id=e.id AND dc.check_date=?
-        WHERE e.active=1
-        ORDER BY e.or_room, e.name
-    """, conn, params=(d,))
-    conn.close()
-    return df
+    return _read_frame(FETCH_DAILY_CHECKS_SQL, (d,))
 
 # =========================
 # INIT
 # =========================
-init_db()
+@st.cache_resource
+def _schema_ready():
+    init_db()
+    return True
+
+_schema_ready()
 auto_backup_once_per_day()
 
 # =========================
@@ -216,16 +298,18 @@ if page == "เช็คประจำวัน":
     )
 
     if st.button("บันทึก"):
-        for eid, r in edited.iterrows():
-            upsert_daily_check(
-                d.isoformat(),
-                int(eid),
-                r["status"],
-                r["maintenance_date"] or None,
-                r["damage_reason"],
-                r["remark"],
-                r["checked_by"] or by
-            )
+        # pull whole columns once instead of building a Series per row
+        n = len(edited)
+        upsert_daily_checks(zip(
+            [d.isoformat()] * n,
+            edited.index.astype(int).tolist(),
+            edited["status"].tolist(),
+            [m or None for m in edited["maintenance_date"].tolist()],
+            edited["damage_reason"].tolist(),
+            edited["remark"].tolist(),
+            [c or by for c in edited["checked_by"].tolist()],
+            [datetime.now().isoformat()] * n,
+        ))
         st.success("บันทึกเรียบร้อย")
         st.rerun()
 
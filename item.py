@@ -7,9 +7,11 @@
 
 import os
 import io
+import re
 import hmac
 from datetime import date, datetime
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -22,8 +24,7 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-st.markdown(
-    """
+APP_CSS = """
 <style>
 /* ----- iPad friendly typography ----- */
 html, body, [class*="css"]  { font-size: 18px !important; }
@@ -96,6 +97,14 @@ section[data-testid="stSidebar"] .stMarkdown { font-size: 0.98rem; }
 .metric-card.blue  { background: linear-gradient(135deg, #4dabf7 0%, #1971c2 100%); }
 .metric-card.red   { background: linear-gradient(135deg, #ff6b6b 0%, #c92a2a 100%); }
 
+/* 4 metric cards in one markdown element (CSS grid instead of st.columns) */
+.metric-grid {
+    display: grid;
+    grid-template-columns: repeat(4, 1fr);
+    gap: 1rem;
+}
+@media (max-width: 640px) { .metric-grid { grid-template-columns: repeat(2, 1fr); } }
+
 /* Equipment card styling */
 .equipment-card {
     background: white;
@@ -120,9 +129,16 @@ div[role="radiogroup"] label { padding: 0.2rem 0.2rem; }
 /* Hide Streamlit footer */
 footer {visibility: hidden;}
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+@st.cache_resource
+def _minified_css() -> str:
+    """Strip comments/whitespace once per process; the style block is resent on every rerun."""
+    css = re.sub(r"/\*.*?\*/", "", APP_CSS, flags=re.S)
+    return re.sub(r"\s+", " ", css).strip()
+
+# Must be emitted on every rerun: Streamlit drops elements that a rerun doesn't redraw.
+st.markdown(_minified_css(), unsafe_allow_html=True)
 
 # ==============================
 # 1) SETTINGS (Cloud-safe)
@@ -232,19 +248,39 @@ def _turso():
 # ==============================
 # 4) TURSO CONNECTIONS
 # ==============================
-def _get_emergency_conn():
-    create_turso_connection, _, _ = _turso()
-    return create_turso_connection(EMERGENCY_CART_URL, EMERGENCY_CART_TOKEN)
+# One pool per database: 1 write connection + N read connections, kept open
+# across reruns/sessions so queries don't pay a TLS/auth handshake each time.
+TURSO_READERS = 4
+
+@st.cache_resource
+def _emergency_pool():
+    _turso()  # friendly error if turso_wrapper can't be imported
+    from turso_wrapper import create_turso_pool
+    return create_turso_pool(EMERGENCY_CART_URL, EMERGENCY_CART_TOKEN, readers=TURSO_READERS)
+
+@st.cache_resource
+def _equipment_pool():
+    _turso()
+    from turso_wrapper import create_turso_pool
+    return create_turso_pool(EQUIPMENT_URL, EQUIPMENT_TOKEN, readers=TURSO_READERS)
+
+def _emergency_read():
+    return _emergency_pool().read_conn()
+
+def _emergency_write():
+    return _emergency_pool().write_conn()
+
+def _equipment_read():
+    return _equipment_pool().read_conn()
 
-def _get_equipment_conn():
-    create_turso_connection, _, _ = _turso()
-    return create_turso_connection(EQUIPMENT_URL, EQUIPMENT_TOKEN)
+def _equipment_write():
+    return _equipment_pool().write_conn()
 
 # ==============================
 # 5) Emergency Cart DB funcs
 # ==============================
 def _init_emergency_db() -> None:
-    with _get_emergency_conn() as conn:
+    with _emergency_write() as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS items (
@@ -261,7 +297,7 @@ def _init_emergency_db() -> None:
 def _seed_emergency_if_enabled() -> None:
     if not ALLOW_DEMO_SEED:
         return
-    with _get_emergency_conn() as conn:
+    with _emergency_write() as conn:
         count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
         if count and count > 0:
             return
@@ -276,13 +312,38 @@ def _seed_emergency_if_enabled() -> None:
         )
         conn.commit()
 
-@st.cache_data(ttl=30)
-def load_items() -> pd.DataFrame:
+@st.cache_resource
+def _emergency_schema_ready() -> bool:
+    """Create table (+ optional demo seed) once per process, not on every load"""
     _init_emergency_db()
     _seed_emergency_if_enabled()
+    return True
+
+_ETT_RE = re.compile(r"\bETT\b|endotracheal", re.IGNORECASE)
+
+def _today_epoch_day() -> int:
+    return int(np.datetime64(date.today(), "D").astype(np.int64))
+
+def _months_before(d: np.ndarray, months: int) -> np.ndarray:
+    """Same day N months earlier on datetime64[D], clamped to month end like
+    pd.DateOffset (e.g. 2028-02-29 - 24 months -> 2026-02-28); NaT stays NaT"""
+    m = d.astype("datetime64[M]")
+    dom = (d - m.astype("datetime64[D]")).astype(np.int64)
+    tm = m - months
+    month_len = ((tm + 1).astype("datetime64[D]") - tm.astype("datetime64[D]")).astype(np.int64)
+    return tm.astype("datetime64[D]") + np.minimum(dom, month_len - 1)
+
+def _days_until(ts: pd.Series, today_day: int) -> np.ndarray:
+    """Whole days from today as float (NaN for NaT), via epoch-day ints"""
+    d = ts.to_numpy(dtype="datetime64[D]")
+    return np.where(np.isnat(d), np.nan, d.astype(np.int64) - today_day)
+
+@st.cache_data(ttl=30)
+def load_items() -> pd.DataFrame:
+    _emergency_schema_ready()
 
     _, turso_read_sql, _ = _turso()
-    with _get_emergency_conn() as conn:
+    with _emergency_read() as conn:
         df = turso_read_sql(
             """
             SELECT
@@ -297,41 +358,101 @@ def load_items() -> pd.DataFrame:
             conn,
         )
     if not df.empty:
-        df["Item_Name"] = df["Item_Name"].astype(str).str.strip()
-        df["Stock"] = pd.to_numeric(df["Stock"], errors="coerce").fillna(0).astype(int)
-        df["Current_Stock"] = pd.to_numeric(df["Current_Stock"], errors="coerce").fillna(df["Stock"]).astype(int)
+        # convert once to StringDtype; callers use .str directly without astype(str)
+        df["Item_Name"] = df["Item_Name"].astype("string").str.strip()
+        # small counts: int32 halves the bytes every mask / sum touches
+        df["Stock"] = pd.to_numeric(df["Stock"], errors="coerce").fillna(0).astype(np.int32)
+        df["Current_Stock"] = pd.to_numeric(df["Current_Stock"], errors="coerce").fillna(df["Stock"]).astype(np.int32)
+
+    # Derived columns are computed here so they are cached with the data
+    # exp_date is stored as YYYY-MM-DD (db_update_exp / migration); only legacy
+    # rows that miss the fixed format go through the slow mixed parser.
+    # Note: the old format="mixed", dayfirst=True parse read ISO dates day-first
+    # (2026-01-02 became 1 Feb), so ISO rows now get their real expiry date and
+    # their Days_to_Expire / expiry alerts can move compared to before.
+    exp_ts = pd.to_datetime(df["EXP_Date"], errors="coerce", format="%Y-%m-%d")
+    residue = exp_ts.isna() & df["EXP_Date"].notna()
+    if residue.any():
+        exp_ts[residue] = pd.to_datetime(df.loc[residue, "EXP_Date"], errors="coerce", format="mixed", dayfirst=True)
+    df["EXP_Date_ts"] = exp_ts
+    today_day = _today_epoch_day()
+    # day counts fit float32 exactly (NaN = no date)
+    df["Days_to_Expire"] = _days_until(df["EXP_Date_ts"], today_day).astype(np.float32)
+
+    # plain numpy bool (not the NA-aware "boolean" dtype) so masks stay cheap
+    df["Is_ETT"] = df["Item_Name"].str.contains(_ETT_RE, na=False).to_numpy(dtype=bool)
+    # lowercase mirror for the dashboard search (plain substring match, no regex)
+    df["_Item_Name_lc"] = df["Item_Name"].str.lower()
+    # EXP - 24 months as int month arithmetic (no per-element DateOffset)
+    due = _months_before(df["EXP_Date_ts"].to_numpy(dtype="datetime64[D]"), 24)
+    due[~df["Is_ETT"].to_numpy(dtype=bool)] = np.datetime64("NaT")
+    df["Exchange_Due_ts"] = pd.to_datetime(due)
+    df["Days_to_Exchange"] = _days_until(df["Exchange_Due_ts"], today_day).astype(np.float32)
+
+    # alert masks once per cache window; pages only sum / select with them
+    # (NaN compares False, so rows without a date fall out of every mask)
+    days = df["Days_to_Expire"].to_numpy(dtype=float)
+    exch = df["Days_to_Exchange"].to_numpy(dtype=float)
+    df["_expired"] = days <= 0
+    df["_exp30"] = (days > 0) & (days <= 30)
+    df["_exch_overdue"] = exch <= 0
+    df["_exch30"] = (exch > 0) & (exch <= 30)
+    # Stock / Current_Stock are already int (coerced once above)
+    df["_zero_stock"] = df["Current_Stock"].to_numpy(dtype=float) <= 0
+
+    # keep datetime64 (no per-cell date objects); pages format them at render time
+    df["EXP_Date"] = df["EXP_Date_ts"]
+    df["Exchange_Due"] = df["Exchange_Due_ts"]
     return df
 
+@st.cache_data(ttl=30)
+def prepare_items() -> tuple[pd.DataFrame, pd.DataFrame, tuple[str, ...], dict[str, int]]:
+    """(df_items, df_sorted, item_names, item_pos) — sort by EXP and build the sidebar
+    options + name -> df_sorted row position once per cache window instead of every rerun"""
+    df = load_items()
+    df_sorted = df.sort_values(["EXP_Date_ts", "Item_Name"], na_position="last").reset_index(drop=True)
+    first = df_sorted["Item_Name"].dropna().astype(str).drop_duplicates()
+    item_names = tuple(first)
+    item_pos = dict(zip(item_names, first.index.tolist()))
+    return df, df_sorted, item_names, item_pos
+
 def db_update_exp(item_name: str, new_exp: date) -> None:
     exp_iso = pd.to_datetime(new_exp).strftime("%Y-%m-%d")
-    with _get_emergency_conn() as conn:
+    with _emergency_write() as conn:
         conn.execute("UPDATE items SET exp_date=? WHERE item_name=?", (exp_iso, item_name))
         conn.commit()
 
 def db_cut_stock(item_name: str, qty_use: int) -> None:
-    with _get_emergency_conn() as conn:
-        row = conn.execute("SELECT current_stock FROM items WHERE item_name=?", (item_name,)).fetchone()
-        cur = int(row[0]) if row and row[0] is not None else 0
-        if cur <= 0:
-            raise ValueError("Stock หมดแล้ว")
-        if qty_use > cur:
+    qty_use = int(qty_use)
+    with _emergency_write() as conn:
+        # guarded decrement in one statement: no read-modify-write round trip
+        cur = conn.execute(
+            "UPDATE items SET current_stock = current_stock - ? "
+            "WHERE item_name=? AND current_stock > 0 AND current_stock >= ?",
+            (qty_use, item_name, qty_use),
+        )
+        if cur.rowcount == 0:
+            row = conn.execute("SELECT current_stock FROM items WHERE item_name=?", (item_name,)).fetchone()
+            stock = int(row[0]) if row and row[0] is not None else 0
+            if stock <= 0:
+                raise ValueError("Stock หมดแล้ว")
             raise ValueError("จำนวนที่ใช้มากกว่า Stock ปัจจุบัน")
-        conn.execute("UPDATE items SET current_stock=? WHERE item_name=?", (cur - int(qty_use), item_name))
         conn.commit()
 
 def db_reset_stock(item_name: str) -> int:
-    with _get_emergency_conn() as conn:
-        row = conn.execute("SELECT stock FROM items WHERE item_name=?", (item_name,)).fetchone()
-        base = int(row[0]) if row and row[0] is not None else 0
-        conn.execute("UPDATE items SET current_stock=? WHERE item_name=?", (base, item_name))
+    with _emergency_write() as conn:
+        row = conn.execute(
+            "UPDATE items SET current_stock = COALESCE(stock, 0) WHERE item_name=? RETURNING current_stock",
+            (item_name,),
+        ).fetchone()
         conn.commit()
-    return base
+    return int(row[0]) if row else 0
 
 # ==============================
 # 6) Equipment DB funcs
 # ==============================
 def init_equipment_db() -> None:
-    with _get_equipment_conn() as conn:
+    with _equipment_write() as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS equipment (
@@ -359,11 +480,14 @@ def init_equipment_db() -> None:
             )
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_dc_eq_id ON daily_checks(equipment_id, id DESC)"
+        )
         conn.commit()
 
 def seed_initial_equipment() -> None:
     init_equipment_db()
-    with _get_equipment_conn() as conn:
+    with _equipment_write() as conn:
         count = conn.execute("SELECT COUNT(*) FROM equipment").fetchone()[0]
         if count and count > 0:
             return
@@ -377,13 +501,18 @@ def seed_initial_equipment() -> None:
         )
         conn.commit()
 
+@st.cache_resource
+def _equipment_schema_ready() -> bool:
+    """Create tables/indexes and seed once per process, not on every call"""
+    seed_initial_equipment()
+    return True
+
 @st.cache_data(ttl=30)
 def load_equipment() -> pd.DataFrame:
-    init_equipment_db()
-    seed_initial_equipment()
+    _equipment_schema_ready()
 
     _, turso_read_sql, _ = _turso()
-    with _get_equipment_conn() as conn:
+    with _equipment_read() as conn:
         df = turso_read_sql(
             """
             SELECT
@@ -395,35 +524,44 @@ def load_equipment() -> pd.DataFrame:
         )
     return df
 
-def add_daily_check(equipment_id: int, status: str, borrowed_to: str, remark: str, checked_by: str) -> None:
-    init_equipment_db()
+def add_daily_checks_bulk(rows: list[tuple[int, str, str, str, str]]) -> None:
+    """บันทึกผลตรวจหลายเครื่องในครั้งเดียว: rows = (equipment_id, status, borrowed_to, remark, checked_by)"""
+    if not rows:
+        return
+    _equipment_schema_ready()
     now = datetime.now()
     check_date = now.date().isoformat()
     check_time = now.strftime("%H:%M:%S")
-    with _get_equipment_conn() as conn:
-        conn.execute(
+    params = [
+        (
+            equipment_id,
+            check_date,
+            check_time,
+            status,
+            borrowed_to.strip() if borrowed_to else None,
+            remark.strip() if remark else None,
+            checked_by.strip() if checked_by else None,
+        )
+        for equipment_id, status, borrowed_to, remark, checked_by in rows
+    ]
+    with _equipment_write() as conn:
+        conn.executemany(
             """
             INSERT INTO daily_checks
             (equipment_id, check_date, check_time, status, borrowed_to, remark, checked_by)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                equipment_id,
-                check_date,
-                check_time,
-                status,
-                borrowed_to.strip() if borrowed_to else None,
-                remark.strip() if remark else None,
-                checked_by.strip() if checked_by else None,
-            ),
+            params,
         )
         conn.commit()
-        conn.commit()
+
+def add_daily_check(equipment_id: int, status: str, borrowed_to: str, remark: str, checked_by: str) -> None:
+    add_daily_checks_bulk([(equipment_id, status, borrowed_to, remark, checked_by)])
 
 def add_equipment(name: str, pgh_code: str, serial_number: str) -> None:
     """เพิ่มอุปกรณ์ใหม่"""
-    init_equipment_db()
-    with _get_equipment_conn() as conn:
+    _equipment_schema_ready()
+    with _equipment_write() as conn:
         conn.execute(
             "INSERT INTO equipment (name, pgh_code, serial_number) VALUES (?, ?, ?)",
             (name.strip(), pgh_code.strip(), serial_number.strip())
@@ -432,8 +570,8 @@ def add_equipment(name: str, pgh_code: str, serial_number: str) -> None:
 
 def update_equipment(equipment_id: int, name: str, pgh_code: str, serial_number: str) -> None:
     """แก้ไขข้อมูลอุปกรณ์"""
-    init_equipment_db()
-    with _get_equipment_conn() as conn:
+    _equipment_schema_ready()
+    with _equipment_write() as conn:
         conn.execute(
             "UPDATE equipment SET name=?, pgh_code=?, serial_number=? WHERE id=?",
             (name.strip(), pgh_code.strip(), serial_number.strip(), equipment_id)
@@ -442,18 +580,19 @@ def update_equipment(equipment_id: int, name: str, pgh_code: str, serial_number:
 
 def delete_equipment(equipment_id: int) -> None:
     """ลบอุปกรณ์ (และประวัติการตรวจสอบทั้งหมด)"""
-    init_equipment_db()
-    with _get_equipment_conn() as conn:
+    _equipment_schema_ready()
+    with _equipment_write() as conn:
         # ลบประวัติการตรวจสอบก่อน
         conn.execute("DELETE FROM daily_checks WHERE equipment_id=?", (equipment_id,))
         # ลบอุปกรณ์
         conn.execute("DELETE FROM equipment WHERE id=?", (equipment_id,))
         conn.commit()
 
+@st.cache_data(ttl=30)
 def get_latest_status() -> pd.DataFrame:
-    init_equipment_db()
+    _equipment_schema_ready()
     _, turso_read_sql, _ = _turso()
-    with _get_equipment_conn() as conn:
+    with _equipment_read() as conn:
         df = turso_read_sql(
             """
             SELECT
@@ -461,10 +600,11 @@ def get_latest_status() -> pd.DataFrame:
                 dc.check_date, dc.status, dc.borrowed_to, dc.remark
             FROM equipment e
             LEFT JOIN (
-                SELECT equipment_id, check_date, status, borrowed_to, remark
+                SELECT
+                    equipment_id, check_date, status, borrowed_to, remark,
+                    ROW_NUMBER() OVER (PARTITION BY equipment_id ORDER BY id DESC) AS rn
                 FROM daily_checks
-                WHERE id IN (SELECT MAX(id) FROM daily_checks GROUP BY equipment_id)
-            ) dc ON e.id = dc.equipment_id
+            ) dc ON e.id = dc.equipment_id AND dc.rn = 1
             ORDER BY e.name
             """,
             conn,
@@ -474,34 +614,76 @@ def get_latest_status() -> pd.DataFrame:
 # ==============================
 # 7) UI helpers
 # ==============================
-def status_badge_html(status: str) -> str:
-    badges = {
-        "พร้อมใช้": "badge-ready",
-        "ไม่พร้อมใช้": "badge-not-ready",
-        "วอร์ดอื่นยืม": "badge-borrowed",
-        "รอซ่อม": "badge-not-ready",
-    }
-    badge_class = badges.get(status, "")
-    icon = "✅" if status == "พร้อมใช้" else "📤" if status == "วอร์ดอื่นยืม" else "❌" if status == "รอซ่อม" else "⚠️"
-    return f'<span class="status-badge {badge_class}">{icon} {status}</span>'
+EQUIPMENT_STATUSES = ["พร้อมใช้", "ไม่พร้อมใช้", "วอร์ดอื่นยืม", "รอซ่อม"]
 
+STATUS_LABELS: dict[str, str] = {
+    "พร้อมใช้": "✅ พร้อมใช้",
+    "ไม่พร้อมใช้": "⚠️ ไม่พร้อมใช้",
+    "วอร์ดอื่นยืม": "📤 วอร์ดอื่นยืม",
+    "รอซ่อม": "❌ รอซ่อม",
+}
+STATUS_UNCHECKED = "⚪ ยังไม่ได้ตรวจสอบ"
+
+def status_labels(status: pd.Series) -> pd.Series:
+    """Plain-text status with icon (for st.dataframe cells, which can't render HTML)"""
+    labels = status.map(STATUS_LABELS)
+    # unknown free-text statuses keep the warning icon; missing ones are unchecked
+    return labels.fillna("⚠️ " + status.astype("string")).fillna(STATUS_UNCHECKED)
+
+def _xlsx_write_frame(ws, df: pd.DataFrame, date_fmt) -> None:
+    """Write header + rows strictly top-to-bottom (required by constant_memory)"""
+    ws.write_row(0, 0, [str(c) for c in df.columns])
+    for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        for c, v in enumerate(row):
+            if pd.isna(v):
+                continue
+            if isinstance(v, (date, datetime)):
+                ws.write_datetime(r, c, v, date_fmt)
+            else:
+                ws.write(r, c, v)
+
+# cached on the frame contents: idle reruns reuse the bytes instead of re-encoding
+@st.cache_data(show_spinner=False, max_entries=8)
 def make_alert_excel(sheets: list[tuple[str, pd.DataFrame]]) -> bytes:
+    # xlsxwriter constant_memory streams each row to disk instead of holding
+    # the whole workbook in memory. pandas.to_excel writes column by column,
+    # which constant_memory can't handle, so rows are written directly.
+    import xlsxwriter
+
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        written = False
-        for name, df in sheets:
-            if df is not None and not df.empty:
-                df.to_excel(writer, sheet_name=name[:31], index=False)
-                written = True
-        if not written:
-            pd.DataFrame({"message": ["No alerts right now 🎉"]}).to_excel(writer, sheet_name="README", index=False)
-    output.seek(0)
+    wb = xlsxwriter.Workbook(output, {"constant_memory": True})
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd"})
+    written = False
+    for name, df in sheets:
+        if df is not None and not df.empty:
+            _xlsx_write_frame(wb.add_worksheet(name[:31]), df, date_fmt)
+            written = True
+    if not written:
+        _xlsx_write_frame(wb.add_worksheet("README"), pd.DataFrame({"message": ["No alerts right now 🎉"]}), date_fmt)
+    wb.close()
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def make_equipment_status_excel(df_export: pd.DataFrame) -> bytes:
+    """Equipment status sheet (streamed, constant_memory) with auto column widths"""
+    import xlsxwriter
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {"constant_memory": True})
+    ws = wb.add_worksheet("สถานะอุปกรณ์")
+    # Auto-adjust column width (vectorized str.len; blanks count as 0)
+    for idx, col in enumerate(df_export.columns):
+        longest = df_export[col].fillna("").astype(str).str.len().max()
+        max_length = max(0 if pd.isna(longest) else int(longest), len(col)) + 2
+        ws.set_column(idx, idx, min(max_length, 50))
+    _xlsx_write_frame(ws, df_export, wb.add_format({"num_format": "yyyy-mm-dd"}))
+    wb.close()
     return output.getvalue()
 
 # ==============================
 # 8) Emergency Cart calculations (after login only)
 # ==============================
-df_items = load_items()
+df_items, df_sorted, item_names, item_pos = prepare_items()
 
 # Defensive
 for col in ["Item_Name", "Stock", "Current_Stock", "EXP_Date"]:
@@ -509,58 +691,45 @@ for col in ["Item_Name", "Stock", "Current_Stock", "EXP_Date"]:
         st.error(f"❌ ข้อมูลขาดคอลัมน์ที่จำเป็น: {col}")
         st.stop()
 
-exp_ts = pd.to_datetime(df_items["EXP_Date"], errors="coerce", format="mixed", dayfirst=True)
-df_items["EXP_Date_ts"] = exp_ts
-today = pd.Timestamp.today().normalize()
-df_items["Days_to_Expire"] = (df_items["EXP_Date_ts"] - today).dt.days
-
-df_items["Is_ETT"] = df_items["Item_Name"].astype(str).str.contains(r"\bETT\b|endotracheal", case=False, na=False)
-df_items["Exchange_Due_ts"] = pd.NaT
-mask_ett = df_items["Is_ETT"] & df_items["EXP_Date_ts"].notna()
-df_items.loc[mask_ett, "Exchange_Due_ts"] = df_items.loc[mask_ett, "EXP_Date_ts"] - pd.DateOffset(months=24)
-df_items["Days_to_Exchange"] = (df_items["Exchange_Due_ts"] - today).dt.days
-
-df_items["EXP_Date"] = df_items["EXP_Date_ts"].dt.date
-df_items["Exchange_Due"] = df_items["Exchange_Due_ts"].dt.date
-
-df_sorted = df_items.sort_values(["EXP_Date_ts", "Item_Name"], na_position="last").reset_index(drop=True)
+def badge_for_rows(df: pd.DataFrame) -> np.ndarray:
+    """Status badge per row (vectorized; first matching rule wins)"""
+    days = df["Days_to_Expire"].to_numpy(dtype=float)
+    cur = df["Current_Stock"].to_numpy(dtype=float)
+    return np.select(
+        [np.isnan(days), cur <= 0, days <= 0, days <= 30, cur == 1],
+        ["⚪ No EXP", "❌ Out", "🔴 EXP", "🟡 ≤30d", "⚠️ Low"],
+        default="🟢 OK",
+    )
 
-def badge_for_row(row: pd.Series) -> str:
-    days = row.get("Days_to_Expire", None)
-    cur = row.get("Current_Stock", None)
-    if pd.isna(days):
-        return "⚪ No EXP"
-    try:
-        if float(cur) <= 0:
-            return "❌ Out"
-    except Exception:
-        pass
-    if days <= 0:
-        return "🔴 EXP"
-    if 0 < days <= 30:
-        return "🟡 ≤30d"
-    try:
-        if float(cur) == 1:
-            return "⚠️ Low"
-    except Exception:
-        pass
-    return "🟢 OK"
-
-def highlight_row(row: pd.Series):
-    days = row.get("Days_to_Expire", None)
-    cur = row.get("Current_Stock", None)
-    if pd.isna(days):
-        return [""] * len(row)
-    if days <= 0:
-        return ["background-color: #ffe5e5"] * len(row)
-    if 0 < days <= 30:
-        return ["background-color: #fff7d6"] * len(row)
-    try:
-        if float(cur) <= 0:
-            return ["background-color: #ffe5e5"] * len(row)
-    except Exception:
-        pass
-    return [""] * len(row)
+# Styler builds per-cell HTML/CSS in Python; past this many rows fall back to
+# the plain grid (the Status emoji column still carries the alert level)
+STYLER_MAX_ROWS = 200
+
+# EXP_Date / Exchange_Due are datetime64; show them as plain dates
+DATE_COLUMN_CONFIG = {c: st.column_config.DateColumn(c, format="YYYY-MM-DD") for c in ("EXP_Date", "Exchange_Due")}
+
+def highlight_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Row background CSS for Styler.apply(axis=None)"""
+    days = df["Days_to_Expire"].to_numpy(dtype=float)
+    cur = df["Current_Stock"].to_numpy(dtype=float)
+    css = np.select(
+        [np.isnan(days), days <= 0, days <= 30, cur <= 0],
+        ["", "background-color: #ffe5e5", "background-color: #fff7d6", "background-color: #ffe5e5"],
+        default="",
+    )
+    return pd.DataFrame(np.repeat(css[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
+
+def dashboard_view(df_sorted: pd.DataFrame, search: str) -> pd.DataFrame:
+    """Filtered checklist columns + Status badge, built from the frame prepare_items()
+    returned so the table always matches the metric cards (no second cache window)"""
+    cols = [c for c in ["Item_Name", "Current_Stock", "Stock", "Days_to_Expire", "EXP_Date"] if c in df_sorted.columns]
+    # one selection (rows + columns) is the only copy; df_sorted itself is never modified
+    if search:
+        df_view = df_sorted.loc[df_sorted["_Item_Name_lc"].str.contains(search, regex=False, na=False), cols]
+    else:
+        df_view = df_sorted[cols]
+    df_view.insert(0, "Status", badge_for_rows(df_view))
+    return df_view
 
 # ==============================
 # 9) PAGES
@@ -569,9 +738,9 @@ def emergency_dashboard_page() -> None:
     st.title("📋 Emergency Cart Checklist")
     st.caption("เรียงตามวันใกล้หมดอายุ • iPad-friendly view")
 
-    expired_count = int((df_sorted["Days_to_Expire"].fillna(999999) <= 0).sum())
-    near_exp_count = int(((df_sorted["Days_to_Expire"].fillna(999999) > 0) & (df_sorted["Days_to_Expire"] <= 30)).sum())
-    zero_stock_count = int((pd.to_numeric(df_sorted["Current_Stock"], errors="coerce").fillna(0) <= 0).sum())
+    expired_count = int(df_sorted["_expired"].sum())
+    near_exp_count = int(df_sorted["_exp30"].sum())
+    zero_stock_count = int(df_sorted["_zero_stock"].sum())
 
     c1, c2, c3 = st.columns(3)
     c1.metric("🛑 หมดอายุแล้ว", expired_count)
@@ -580,18 +749,28 @@ def emergency_dashboard_page() -> None:
 
     st.divider()
     st.subheader("🔎 ค้นหาอุปกรณ์")
-    search_text = st.text_input("พิมพ์บางส่วนของชื่อ (Item_Name)", "")
-
-    df_view = df_sorted.copy()
-    if search_text:
-        df_view = df_view[df_view["Item_Name"].astype(str).str.contains(search_text, case=False, na=False)].copy()
+    search_text = st.text_input("พิมพ์บางส่วนของชื่อ (Item_Name)", "").strip()
 
-    cols = ["Item_Name", "Current_Stock", "Stock", "Days_to_Expire", "EXP_Date"]
-    df_view = df_view[[c for c in cols if c in df_view.columns]].copy()
-    df_view.insert(0, "Status", df_view.apply(badge_for_row, axis=1))
+    # a single character matches almost everything; only filter from 2 chars up
+    df_view = dashboard_view(df_sorted, search_text.lower() if len(search_text) >= 2 else "")
 
-    styled = df_view.style.apply(highlight_row, axis=1).format(na_rep="—")
-    st.dataframe(styled, use_container_width=True, hide_index=True)
+    if len(df_view) <= STYLER_MAX_ROWS:
+        styled = (
+            df_view.style.apply(highlight_rows, axis=None)
+            .format(na_rep="—")
+            .format({"EXP_Date": "{:%Y-%m-%d}", "Days_to_Expire": "{:.0f}"}, na_rep="—")
+        )
+        st.dataframe(styled, use_container_width=True, hide_index=True)
+    else:
+        st.dataframe(
+            df_view,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Days_to_Expire": st.column_config.NumberColumn("Days_to_Expire", format="%d"),
+                **DATE_COLUMN_CONFIG,
+            },
+        )
 
     st.markdown("#### ⬇️ ดาวน์โหลดรายการ (หน้าปัจจุบัน)")
     xlsx = make_alert_excel([("Emergency_Cart", df_view.drop(columns=["Status"], errors="ignore"))])
@@ -606,14 +785,15 @@ def emergency_alerts_page() -> None:
     st.title("⏰ Alerts")
     st.caption("หมดอายุ • ใกล้หมดอายุ ≤ 30 วัน • และ ETT ส่งแลก (EXP - 24 เดือน)")
 
-    df_alert = df_sorted.copy()
-    df_expired = df_alert[df_alert["Days_to_Expire"].fillna(999999) <= 0].copy()
-    df_exp30 = df_alert[(df_alert["Days_to_Expire"].fillna(999999) > 0) & (df_alert["Days_to_Expire"] <= 30)].copy()
+    base_cols = [c for c in ["Item_Name", "Current_Stock", "Stock", "Days_to_Expire", "EXP_Date"] if c in df_sorted.columns]
+    ett_cols = [c for c in ["Item_Name", "Current_Stock", "Stock", "Exchange_Due", "Days_to_Exchange", "EXP_Date"] if c in df_sorted.columns]
 
-    df_ett = df_alert[df_alert["Is_ETT"] == True].copy()
-    df_ett = df_ett[df_ett["Exchange_Due_ts"].notna()].copy()
-    df_ett_overdue = df_ett[df_ett["Days_to_Exchange"].fillna(999999) <= 0].copy()
-    df_ett_30 = df_ett[(df_ett["Days_to_Exchange"].fillna(999999) > 0) & (df_ett["Days_to_Exchange"] <= 30)].copy()
+    # read-only: select rows and display columns in one step with the cached masks
+    # Days_to_Exchange is NaN unless the row is an ETT with an Exchange_Due
+    df_expired = df_sorted.loc[df_sorted["_expired"], base_cols]
+    df_exp30 = df_sorted.loc[df_sorted["_exp30"], base_cols]
+    df_ett_overdue = df_sorted.loc[df_sorted["_exch_overdue"], ett_cols]
+    df_ett_30 = df_sorted.loc[df_sorted["_exch30"], ett_cols]
 
     t1, t2, t3, t4 = st.columns(4)
     t1.metric("🛑 Expired", len(df_expired))
@@ -621,19 +801,16 @@ def emergency_alerts_page() -> None:
     t3.metric("🛑 ETT Exchange overdue", len(df_ett_overdue))
     t4.metric("⚠️ ETT Exchange ≤ 30d", len(df_ett_30))
 
-    base_cols = [c for c in ["Item_Name", "Current_Stock", "Stock", "Days_to_Expire", "EXP_Date"] if c in df_alert.columns]
-    ett_cols = [c for c in ["Item_Name", "Current_Stock", "Stock", "Exchange_Due", "Days_to_Exchange", "EXP_Date"] if c in df_ett.columns]
-
     tab1, tab2, tab3 = st.tabs(["🛑 Expired", "⚠️ Expiring ≤30d", "🔁 ETT Exchange"])
     with tab1:
-        st.dataframe(df_expired[base_cols], use_container_width=True, hide_index=True) if not df_expired.empty else st.success("ไม่มีรายการหมดอายุ 🎉")
+        st.dataframe(df_expired, use_container_width=True, hide_index=True, column_config=DATE_COLUMN_CONFIG) if not df_expired.empty else st.success("ไม่มีรายการหมดอายุ 🎉")
     with tab2:
-        st.dataframe(df_exp30[base_cols], use_container_width=True, hide_index=True) if not df_exp30.empty else st.success("ไม่มีรายการจะหมดอายุใน 30 วัน 👍")
+        st.dataframe(df_exp30, use_container_width=True, hide_index=True, column_config=DATE_COLUMN_CONFIG) if not df_exp30.empty else st.success("ไม่มีรายการจะหมดอายุใน 30 วัน 👍")
     with tab3:
         st.markdown("**🛑 เกินกำหนดส่งแลกแล้ว**")
-        st.dataframe(df_ett_overdue[ett_cols], use_container_width=True, hide_index=True) if not df_ett_overdue.empty else st.success("ไม่มีรายการเกินกำหนดส่งแลก 🎉")
+        st.dataframe(df_ett_overdue, use_container_width=True, hide_index=True, column_config=DATE_COLUMN_CONFIG) if not df_ett_overdue.empty else st.success("ไม่มีรายการเกินกำหนดส่งแลก 🎉")
         st.markdown("**⚠️ จะถึงกำหนดส่งแลกใน 30 วัน**")
-        st.dataframe(df_ett_30[ett_cols], use_container_width=True, hide_index=True) if not df_ett_30.empty else st.success("ไม่มีรายการจะถึงกำหนดส่งแลกใน 30 วัน 👍")
+        st.dataframe(df_ett_30, use_container_width=True, hide_index=True, column_config=DATE_COLUMN_CONFIG) if not df_ett_30.empty else st.success("ไม่มีรายการจะถึงกำหนดส่งแลกใน 30 วัน 👍")
 
 def equipment_dashboard_page() -> None:
     st.title("📊 Dashboard - เครื่องมืออุปกรณ์")
@@ -645,15 +822,16 @@ def equipment_dashboard_page() -> None:
     borrowed = len(df_status[df_status.get("status") == "วอร์ดอื่นยืม"]) if not df_status.empty else 0
     not_ready = len(df_status[df_status.get("status").isin(["ไม่พร้อมใช้", "รอซ่อม"])]) if not df_status.empty else 0
 
-    c1, c2, c3, c4 = st.columns(4)
-    with c1:
-        st.markdown(f'<div class="metric-card"><h3>{total}</h3><p>เครื่องมือทั้งหมด</p></div>', unsafe_allow_html=True)
-    with c2:
-        st.markdown(f'<div class="metric-card green"><h3>{ready}</h3><p>✅ พร้อมใช้</p></div>', unsafe_allow_html=True)
-    with c3:
-        st.markdown(f'<div class="metric-card blue"><h3>{borrowed}</h3><p>📤 วอร์ดอื่นยืม</p></div>', unsafe_allow_html=True)
-    with c4:
-        st.markdown(f'<div class="metric-card red"><h3>{not_ready}</h3><p>❌ ไม่พร้อมใช้</p></div>', unsafe_allow_html=True)
+    # one element for all cards instead of 4 columns x 1 markdown each
+    st.markdown(
+        '<div class="metric-grid">'
+        f'<div class="metric-card"><h3>{total}</h3><p>เครื่องมือทั้งหมด</p></div>'
+        f'<div class="metric-card green"><h3>{ready}</h3><p>✅ พร้อมใช้</p></div>'
+        f'<div class="metric-card blue"><h3>{borrowed}</h3><p>📤 วอร์ดอื่นยืม</p></div>'
+        f'<div class="metric-card red"><h3>{not_ready}</h3><p>❌ ไม่พร้อมใช้</p></div>'
+        '</div>',
+        unsafe_allow_html=True,
+    )
 
 
     st.divider()
@@ -669,49 +847,30 @@ def equipment_dashboard_page() -> None:
             df_export.columns = ['ชื่อเครื่องมือ', 'รหัส PGH', 'Serial Number', 'สถานะ', 'ยืมไปที่', 'หมายเหตุ']
             
             # แปลงเป็น Excel
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                df_export.to_excel(writer, index=False, sheet_name='สถานะอุปกรณ์')
-                # Auto-adjust column width
-                worksheet = writer.sheets['สถานะอุปกรณ์']
-                for idx, col in enumerate(df_export.columns):
-                    max_length = max(
-                        df_export[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
-            
-            buffer.seek(0)
+            xlsx = make_equipment_status_excel(df_export)
             today_str = date.today().strftime("%Y%m%d")
             st.download_button(
                 label="📥 ดาวน์โหลด Excel",
-                data=buffer,
+                data=xlsx,
                 file_name=f"equipment_status_{today_str}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
-    st.subheader("📋 สถานะปัจจุบันของเครื่องมือ")
 
     if df_status.empty:
         st.info("ยังไม่มีข้อมูลการตรวจสอบ")
         return
 
-    for _, row in df_status.iterrows():
-        st.markdown('<div class="equipment-card">', unsafe_allow_html=True)
-        col1, col2 = st.columns([3, 2])
-        with col1:
-            st.markdown(f"**{row.get('name','-')}**")
-            st.caption(f"PGH: {row.get('pgh_code','-')} | SN: {row.get('serial_number','-')}")
-        with col2:
-            if pd.notna(row.get("status")):
-                st.markdown(status_badge_html(row["status"]), unsafe_allow_html=True)
-                if row["status"] == "วอร์ดอื่นยืม" and pd.notna(row.get("borrowed_to")):
-                    st.caption(f"ยืมไป: {row.get('borrowed_to')}")
-            else:
-                st.markdown('<span class="status-badge badge-gray">ยังไม่ได้ตรวจสอบ</span>', unsafe_allow_html=True)
-        if pd.notna(row.get("remark")) and row.get("remark"):
-            st.caption(f"💬 หมายเหตุ: {row.get('remark')}")
-        st.markdown("</div>", unsafe_allow_html=True)
+    # one dataframe widget instead of ~5 markdown/caption elements per equipment
+    df_display = pd.DataFrame({
+        "ชื่อเครื่องมือ": df_status["name"],
+        "รหัส PGH": df_status["pgh_code"],
+        "Serial Number": df_status["serial_number"],
+        "สถานะ": status_labels(df_status["status"]),
+        "ยืมไปที่": df_status["borrowed_to"].where(df_status["status"] == "วอร์ดอื่นยืม"),
+        "💬 หมายเหตุ": df_status["remark"],
+    })
+    st.dataframe(df_display, use_container_width=True, hide_index=True)
 
 def equipment_daily_check_page() -> None:
     st.title("✅ ตรวจสอบรายวัน")
@@ -722,39 +881,61 @@ def equipment_daily_check_page() -> None:
         return
 
     st.divider()
-    st.info(f"📋 เครื่องมือทั้งหมด {len(df_equipment)} รายการ - เลือกสถานะแล้วกดบันทึกได้เลย")
-
-    for _, equipment in df_equipment.iterrows():
-        st.markdown('<div class="equipment-card">', unsafe_allow_html=True)
-        st.markdown(f"### {equipment['name']}")
-        st.caption(f"PGH: {equipment.get('pgh_code','-')} | SN: {equipment.get('serial_number','-')}")
-
-        with st.form(key=f"form_{equipment['id']}"):
-            col1, col2, col3 = st.columns([2, 2, 1])
-            with col1:
-                status = st.radio(
-                    "สถานะ",
-                    ["พร้อมใช้", "ไม่พร้อมใช้", "วอร์ดอื่นยืม", "รอซ่อม"],
-                    horizontal=True,
-                    index=0,
-                )
-            with col2:
-                borrowed_to = st.text_input("ยืมไปที่ (ถ้ามี)") if status == "วอร์ดอื่นยืม" else ""
-                remark = st.text_input("หมายเหตุ")
-            with col3:
-                st.write("")
-                submitted = st.form_submit_button("💾 บันทึก", use_container_width=True, type="primary")
-
-            if submitted:
-                try:
-                    add_daily_check(int(equipment["id"]), status, borrowed_to, remark, "System")
-                    st.success(f"✅ บันทึก '{equipment['name']}' เรียบร้อย")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ ผิดพลาด: {e}")
+    st.info(f"📋 เครื่องมือทั้งหมด {len(df_equipment)} รายการ - เลือกสถานะแล้วกดบันทึกครั้งเดียว")
+
+    # one editable grid + one submit -> a single batched insert for the rows that changed;
+    # each row starts from the device's latest check so untouched rows keep their status
+    latest = get_latest_status().set_index("id").reindex(df_equipment["id"])
+    df_form = pd.DataFrame({
+        "id": df_equipment["id"].to_numpy(),
+        "ชื่อเครื่องมือ": df_equipment["name"].to_numpy(),
+        "PGH": df_equipment["pgh_code"].to_numpy(),
+        "SN": df_equipment["serial_number"].to_numpy(),
+        "สถานะ": latest["status"].astype(object).where(latest["status"].notna(), None).to_numpy(),
+        "ยืมไปที่": latest["borrowed_to"].fillna("").to_numpy(),
+        "หมายเหตุ": latest["remark"].fillna("").to_numpy(),
+    })
+    check_cols = ["สถานะ", "ยืมไปที่", "หมายเหตุ"]
+    with st.form("daily_check_form"):
+        edited = st.data_editor(
+            df_form,
+            hide_index=True,
+            use_container_width=True,
+            key="daily_check_editor",
+            column_order=["ชื่อเครื่องมือ", "PGH", "SN", *check_cols],
+            disabled=["ชื่อเครื่องมือ", "PGH", "SN"],
+            column_config={
+                "สถานะ": st.column_config.SelectboxColumn("สถานะ", options=EQUIPMENT_STATUSES),
+                "ยืมไปที่": st.column_config.TextColumn("ยืมไปที่ (ถ้ามี)"),
+            },
+        )
+        submitted = st.form_submit_button("💾 บันทึกทั้งหมด", use_container_width=True, type="primary")
 
-        st.markdown("</div>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+    if submitted:
+        changed = (edited[check_cols].fillna("").astype(str) != df_form[check_cols].fillna("").astype(str)).any(axis=1)
+        changed_rows = edited.loc[changed]
+        if changed_rows.empty:
+            st.info("ℹ️ ไม่มีรายการที่เปลี่ยนแปลง")
+            return
+        if changed_rows["สถานะ"].isna().any():
+            st.error("❌ กรุณาเลือกสถานะให้ครบทุกรายการที่แก้ไข")
+            return
+        borrowed = changed_rows["ยืมไปที่"].where(changed_rows["สถานะ"] == "วอร์ดอื่นยืม", "")
+        rows = list(zip(
+            changed_rows["id"].astype(int).tolist(),
+            changed_rows["สถานะ"].tolist(),
+            borrowed.tolist(),
+            changed_rows["หมายเหตุ"].tolist(),
+            ["System"] * len(changed_rows),
+        ))
+        try:
+            add_daily_checks_bulk(rows)
+            get_latest_status.clear()
+            load_equipment.clear()
+            st.success(f"✅ บันทึก {len(rows)} รายการเรียบร้อย")
+            st.rerun()
+        except Exception as e:
+            st.error(f"❌ ผิดพลาด: {e}")
 
 def equipment_manage_page() -> None:
     """หน้าจัดการอุปกรณ์ (เพิ่ม/แก้ไข/ลบ)"""
@@ -802,51 +983,56 @@ def equipment_manage_page() -> None:
             st.info("ยังไม่มีอุปกรณ์ในระบบ กรุณาเพิ่มอุปกรณ์ในแท็บ 'เพิ่มอุปกรณ์ใหม่' ก่อน")
             return
         
-        # แสดงรายการอุปกรณ์
-        for _, equip in df_equipment.iterrows():
-            with st.expander(f"🔧 {equip['name']}", expanded=False):
-                st.markdown(f"**PGH:** {equip.get('pgh_code', '-')} | **SN:** {equip.get('serial_number', '-')}")
-                
-                # ฟอร์มแก้ไข
-                with st.form(f"edit_form_{equip['id']}"):
-                    st.markdown("### แก้ไขข้อมูล")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        edit_name = st.text_input("ชื่อเครื่องมือ", value=equip['name'], key=f"name_{equip['id']}")
-                        edit_pgh = st.text_input("รหัส PGH", value=equip.get('pgh_code', ''), key=f"pgh_{equip['id']}")
-                    with col2:
-                        edit_sn = st.text_input("Serial Number", value=equip.get('serial_number', ''), key=f"sn_{equip['id']}")
-                    
-                    col_btn1, col_btn2 = st.columns(2)
-                    with col_btn1:
-                        update_btn = st.form_submit_button("💾 บันทึกการแก้ไข", use_container_width=True, type="primary")
-                    with col_btn2:
-                        delete_btn = st.form_submit_button("🗑️ ลบอุปกรณ์", use_container_width=True, type="secondary")
-                    
-                    if update_btn:
-                        if not edit_name or not edit_name.strip():
-                            st.error("❌ กรุณากรอกชื่อเครื่องมือ")
+        # build one edit form for the chosen device instead of an expander + form per device
+        records = df_equipment.to_dict("records")
+        equip = st.selectbox(
+            "เลือกอุปกรณ์ที่จะแก้ไข",
+            records,
+            format_func=lambda e: f"🔧 {e['name']}",
+            key="edit_equipment_select",
+        )
+        st.markdown(f"**PGH:** {equip.get('pgh_code', '-')} | **SN:** {equip.get('serial_number', '-')}")
+
+        # ฟอร์มแก้ไข
+        with st.form(f"edit_form_{equip['id']}"):
+            st.markdown("### แก้ไขข้อมูล")
+            col1, col2 = st.columns(2)
+            with col1:
+                edit_name = st.text_input("ชื่อเครื่องมือ", value=equip['name'], key=f"name_{equip['id']}")
+                edit_pgh = st.text_input("รหัส PGH", value=equip.get('pgh_code', ''), key=f"pgh_{equip['id']}")
+            with col2:
+                edit_sn = st.text_input("Serial Number", value=equip.get('serial_number', ''), key=f"sn_{equip['id']}")
+
+            col_btn1, col_btn2 = st.columns(2)
+            with col_btn1:
+                update_btn = st.form_submit_button("💾 บันทึกการแก้ไข", use_container_width=True, type="primary")
+            with col_btn2:
+                delete_btn = st.form_submit_button("🗑️ ลบอุปกรณ์", use_container_width=True, type="secondary")
+
+            if update_btn:
+                if not edit_name or not edit_name.strip():
+                    st.error("❌ กรุณากรอกชื่อเครื่องมือ")
+                else:
+                    try:
+                        update_equipment(int(equip['id']), edit_name, edit_pgh or "", edit_sn or "")
+                        st.cache_data.clear()
+                        st.success(f"✅ แก้ไข '{edit_name}' เรียบร้อยแล้ว")
+                        st.rerun()
+                    except Exception as e:
+                        if "UNIQUE constraint failed" in str(e):
+                            st.error(f"❌ ชื่อเครื่องมือ '{edit_name}' มีอยู่ในระบบแล้ว")
                         else:
-                            try:
-                                update_equipment(int(equip['id']), edit_name, edit_pgh or "", edit_sn or "")
-                                st.cache_data.clear()
-                                st.success(f"✅ แก้ไข '{edit_name}' เรียบร้อยแล้ว")
-                                st.rerun()
-                            except Exception as e:
-                                if "UNIQUE constraint failed" in str(e):
-                                    st.error(f"❌ ชื่อเครื่องมือ '{edit_name}' มีอยู่ในระบบแล้ว")
-                                else:
-                                    st.error(f"❌ เกิดข้อผิดพลาด: {e}")
-                    
-                    if delete_btn:
-                        try:
-                            equip_name = equip['name']  # เก็บชื่อก่อนลบ
-                            delete_equipment(int(equip['id']))
-                            st.cache_data.clear()
-                            st.success(f"✅ ลบอุปกรณ์ '{equip_name}' เรียบร้อยแล้ว")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"❌ ลบไม่สำเร็จ: {e}")
+                            st.error(f"❌ เกิดข้อผิดพลาด: {e}")
+
+            if delete_btn:
+                try:
+                    equip_name = equip['name']  # เก็บชื่อก่อนลบ
+                    delete_equipment(int(equip['id']))
+                    st.cache_data.clear()
+                    st.success(f"✅ ลบอุปกรณ์ '{equip_name}' เรียบร้อยแล้ว")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ ลบไม่สำเร็จ: {e}")
 
 # ==============================
 # 10) SIDEBAR NAV
@@ -862,11 +1048,11 @@ if main_page == "🚑 Emergency Cart":
     st.sidebar.divider()
     st.sidebar.subheader("🎯 เลือกอุปกรณ์")
 
-    item_names = df_sorted["Item_Name"].dropna().astype(str).unique().tolist()
     selected_item = st.sidebar.selectbox("อุปกรณ์", item_names, index=0 if item_names else None)
 
     if selected_item:
-        sel_row = df_sorted[df_sorted["Item_Name"] == selected_item].iloc[0]
+        # O(1) position lookup instead of a boolean scan of Item_Name
+        sel_row = df_sorted.iloc[item_pos[selected_item]]
         exp = sel_row.get("EXP_Date", None)
         days = sel_row.get("Days_to_Expire", None)
         stock = sel_row.get("Stock", None)
@@ -875,7 +1061,7 @@ if main_page == "🚑 Emergency Cart":
         st.sidebar.markdown('<div class="card">', unsafe_allow_html=True)
         st.sidebar.markdown("**สรุปข้อมูล**")
         st.sidebar.markdown(f"Item: **{selected_item}**")
-        st.sidebar.markdown(f"EXP: **{exp if pd.notna(exp) else '—'}**")
+        st.sidebar.markdown(f"EXP: **{f'{exp:%Y-%m-%d}' if pd.notna(exp) else '—'}**")
         st.sidebar.markdown(f"Days to expire: **{int(days) if pd.notna(days) else '—'}**")
         st.sidebar.markdown(f"Stock: **{cur} / {stock}**")
         st.sidebar.markdown("</div>", unsafe_allow_html=True)
@@ -897,9 +1083,8 @@ if main_page == "🚑 Emergency Cart":
                     st.error(f"❌ บันทึกไม่สำเร็จ: {e}")
 
         with st.sidebar.expander("📦 ใช้ของ / ตัด Stock", expanded=False):
-            row_now = df_items[df_items["Item_Name"] == selected_item].iloc[0]
-            base_stock = int(row_now.get("Stock", 0) or 0)
-            cur_stock = int(row_now.get("Current_Stock", 0) or 0)
+            base_stock = int(sel_row.get("Stock", 0) or 0)
+            cur_stock = int(sel_row.get("Current_Stock", 0) or 0)
             st.write(f"Stock ปกติ: **{base_stock}** | คงเหลือ: **{cur_stock}**")
             with st.form("form_cut_stock"):
                 qty_use = st.number_input("จำนวนที่ใช้", min_value=1, value=1, step=1)
@@ -70,10 +70,13 @@ os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
 
 # -----------------------------------
 # สร้าง DataFrame และบันทึกเป็น CSV (UTF-8-SIG)
+# เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย os.replace -> ไฟล์เดิมไม่เสียถ้าเขียนไม่จบ
 # -----------------------------------
 df = pd.DataFrame(items)
 
-df.to_csv(DATA_FILE, index=False, encoding="utf-8-sig")
+tmp_file = DATA_FILE + ".tmp"
+df.to_csv(tmp_file, index=False, encoding="utf-8-sig")
+os.replace(tmp_file, DATA_FILE)
 
 print("สร้างไฟล์ item_ORM.csv สำเร็จแล้วที่พาธ:")
 print(DATA_FILE)
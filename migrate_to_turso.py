@@ -5,7 +5,6 @@ Migration Script: Import data from item_ORM.csv to Turso Database
 
 import pandas as pd
 from turso_wrapper import create_turso_connection
-from datetime import datetime
 
 # ==============================
 # TURSO DATABASE CONFIGURATION
@@ -16,16 +15,10 @@ EMERGENCY_CART_TOKEN = "eyJhbGciOiJFZERTQSIsInR5cCI6IkpXVCJ9.eyJpYXQiOjE3Njc4NTQ
 
 CSV_FILE = r"C:\Users\user\OneDrive - Chulalongkorn University\growth\item_ORM.csv"
 
-def parse_date(date_str):
-    """Convert DD/MM/YYYY to YYYY-MM-DD"""
-    if pd.isna(date_str) or not date_str:
-        return None
-    try:
-        # Parse DD/MM/YYYY format
-        dt = datetime.strptime(str(date_str).strip(), "%d/%m/%Y")
-        return dt.strftime("%Y-%m-%d")
-    except:
-        return None
+def parse_dates(col: pd.Series) -> pd.Series:
+    """Convert a DD/MM/YYYY column to YYYY-MM-DD strings (None where unparseable)"""
+    dt = pd.to_datetime(col.astype("string").str.strip(), format="%d/%m/%Y", errors="coerce")
+    return dt.dt.strftime("%Y-%m-%d").astype(object).where(dt.notna(), None)
 
 def migrate_to_turso():
     """Migrate data from CSV to Turso"""
@@ -40,6 +33,9 @@ def migrate_to_turso():
         df = pd.read_csv(CSV_FILE, encoding='utf-8')
     
     print(f"✅ Found {len(df)} items in CSV")
+
+    # parse the whole EXP column once instead of strptime/strftime per row
+    exp_iso = parse_dates(df['EXP_Date']) if 'EXP_Date' in df.columns else pd.Series(None, index=df.index, dtype=object)
     
     # 2. Connect to Turso
     print("🔗 Connecting to Turso...")
@@ -63,35 +59,36 @@ def migrate_to_turso():
     
     # 5. Insert data
     print("💾 Inserting data...")
-    success_count = 0
-    error_count = 0
-    
-    for idx, row in df.iterrows():
-        try:
-            item_name = str(row.get('Item_Name', '')).strip()
-            stock = int(row.get('Stock', 0))
-            current_stock = int(row.get('Current_Stock', stock))
-            exp_date = parse_date(row.get('EXP_Date', ''))
-            bundle = str(row.get('Bundle', '')).strip().lower() if pd.notna(row.get('Bundle')) else ''
-            
-            if not item_name:
-                print(f"⚠️  Skipping row {idx}: No item name")
-                continue
-            
-            # Insert or replace
-            conn.execute("""
-                INSERT OR REPLACE INTO items 
-                (item_name, stock, current_stock, exp_date, bundle)
-                VALUES (?, ?, ?, ?, ?)
-            """, (item_name, stock, current_stock, exp_date, bundle))
-            
-            success_count += 1
-            if (success_count % 10 == 0):
-                print(f"   ✓ Inserted {success_count} items...")
-                
-        except Exception as e:
-            error_count += 1
-            print(f"❌ Error on row {idx} ({item_name}): {e}")
+    # build whole columns once (no per-row Series from iterrows), then one batch insert
+    names = df.get('Item_Name', pd.Series(pd.NA, index=df.index)).astype("string").str.strip()
+    stock = pd.to_numeric(df['Stock'], errors='coerce') if 'Stock' in df.columns else pd.Series(0, index=df.index)
+    current_stock = pd.to_numeric(df['Current_Stock'], errors='coerce') if 'Current_Stock' in df.columns else stock
+    bundle = df['Bundle'].astype("string").str.strip().str.lower().fillna('') if 'Bundle' in df.columns else pd.Series('', index=df.index)
+
+    has_name = names.fillna('') != ''
+    for idx in df.index[~has_name]:
+        print(f"⚠️  Skipping row {idx}: No item name")
+    bad = has_name & (stock.isna() | current_stock.isna())
+    for idx in df.index[bad]:
+        print(f"❌ Error on row {idx} ({names[idx]}): invalid Stock/Current_Stock")
+    ok = has_name & ~bad
+
+    rows = zip(
+        names[ok].tolist(),
+        stock[ok].astype(int).tolist(),
+        current_stock[ok].astype(int).tolist(),
+        exp_iso[ok].tolist(),
+        bundle[ok].tolist(),
+    )
+    conn.executemany("""
+        INSERT OR REPLACE INTO items 
+        (item_name, stock, current_stock, exp_date, bundle)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+
+    success_count = int(ok.sum())
+    error_count = int(bad.sum())
+    print(f"   ✓ Inserted {success_count} items")
     
     # 6. Verify
     print("\n🔍 Verifying...")
@@ -7,6 +7,9 @@ import pandas as pd
 import asyncio
 import nest_asyncio
 import atexit
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Any, List, Tuple, Optional, Dict
 
 # Enable nested event loops (required for Streamlit)
@@ -87,12 +90,22 @@ class TursoConnection:
             raise
     
     def executemany(self, sql: str, parameters_list: List[tuple]):
-        """Execute SQL with multiple parameter sets"""
-        results = []
-        for params in parameters_list:
-            result = self.execute(sql, params)
-            results.append(result)
-        return results
+        """Execute SQL with multiple parameter sets in one batch (single round trip, one transaction)"""
+        if self._closed:
+            raise Exception("Connection is closed. Create a new connection.")
+
+        stmts = [(sql, tuple(params)) for params in parameters_list]
+        if not stmts:
+            return []
+        self._use_count += len(stmts)
+
+        try:
+            results = self.client.batch(stmts)
+            return [TursoCursor(result) for result in results]
+        except Exception as e:
+            print(f"Error executing batch SQL: {sql}")
+            print(f"Error: {e}")
+            raise
     
     def commit(self):
         """Commit changes (libsql-client auto-commits, so this is a no-op)"""
@@ -146,6 +159,11 @@ class TursoCursor:
             return None
         return tuple(self._rows[0])
     
+    @property
+    def rowcount(self) -> int:
+        """Rows changed by an INSERT/UPDATE/DELETE (-1 if unknown)"""
+        return getattr(self.result, 'rows_affected', -1)
+
     @property
     def description(self):
         """Column descriptions"""
@@ -246,6 +264,48 @@ def create_turso_connection(url: str, auth_token: str) -> TursoConnection:
     return conn
 
 
+class TursoPool:
+    """
+    One dedicated write connection + a small queue of read connections.
+    Connections stay open for the life of the pool (no TLS/auth handshake per query).
+    """
+
+    def __init__(self, url: str, auth_token: str, readers: int = 4):
+        self._writer = TursoConnection(url, auth_token)
+        self._write_lock = threading.Lock()
+        self._readers: "queue.Queue[TursoConnection]" = queue.Queue()
+        for _ in range(max(1, readers)):
+            self._readers.put(TursoConnection(url, auth_token))
+
+    @contextmanager
+    def read_conn(self):
+        """Borrow a read connection; returned to the pool on exit"""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def write_conn(self):
+        """Use the single write connection; writers are serialized"""
+        with self._write_lock:
+            yield self._writer
+
+    def close(self):
+        """Close every connection in the pool"""
+        self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+def create_turso_pool(url: str, auth_token: str, readers: int = 4) -> TursoPool:
+    """Create a read/write connection pool for one Turso database"""
+    pool = TursoPool(url, auth_token, readers)
+    atexit.register(pool.close)
+    return pool
+
+
 def close_all_connections():
     """Close all connections in the pool"""
     for conn_key in list(_connection_pool.keys()):